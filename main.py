@@ -1,23 +1,28 @@
-import ast
 import logging
-from datetime import datetime
+import time
 
-from ultralytics import YOLO
-import cv2
 import telepot
 
 from utils.cv_utils import (
+    downscale_frame,
     draw_boxes,
-    midpoint_bottom,
-    is_point_in_rectangle,
-    zoom_in_frame,
+    calculate_zoom_slice,
     draw_metadata,
     show_frame,
     save_detection_frame,
 )
-from utils.setup_cleanup import load_config, setup_cameras, cleanup_cameras, calculate_frame_size, init_logging, parse_args
-from utils.miscellaneous import calculate_overwatch_end_dt, LoopDelayer, AliveLogger
-from utils.telegram_bot import send_cv2_frame, inform_the_user, send_frame_condition, check_and_report_camera_failure
+from utils.camera_tools import wait_for_new_frame
+from utils.geom import bottom_midpoints_in_zones, warmup_geometry
+from utils.setup_cleanup import load_config, parse_config, setup_cameras, cleanup_cameras, init_logging, parse_args
+from utils.miscellaneous import calculate_overwatch_end_time, LoopDelayer, AliveLogger
+from utils.model_tools import load_model, filter_boxes, InferenceWorker
+from utils.telegram_bot import (
+    send_cv2_frame,
+    inform_the_user,
+    send_frame_condition,
+    check_and_report_camera_failure,
+    wait_for_pending_requests,
+)
 
 
 def main():
@@ -26,87 +31,101 @@ def main():
     logging.info('Loading configuration and running initial setup')
     args = parse_args()  # Parse input arguments (path to config)
     config = load_config(args.config_file)  # Load config file
+    parsed_config = parse_config(config)  # Parse config values used in the main loop
     bot = telepot.Bot(config['Telegram']['token'])  # Prepare telegram bot for sending messages
-    inform_the_user(bot, 'Starting overwatch', 3, config)  # Inform user about overwatch start if verbose is set at level 3 or above
+    inform_the_user(bot, 'Starting overwatch', 3, parsed_config)  # Inform user about overwatch start if verbose is set at level 3 or above
 
     # Setup
     alive_logger = AliveLogger(config['Parameters']['log_status_every_N_minutes'])
-    model = YOLO(config['Model']['path'])  # Load model
     camera_vc_list = setup_cameras(config)  # Initialize camera bufferless videocapture object (as list of objects)
-    frame_width, frame_height = calculate_frame_size(camera_vc_list[0], config)  # Calculate desired frame width and height
+    model, batch_size = load_model(config, len(camera_vc_list))  # Load model (TensorRT engine if enabled in config)
+    inference_worker = InferenceWorker(model, parsed_config.imgsz, batch_size)  # Run the model in a separate thread
+    warmup_geometry()  # Compile geometry functions before the main loop
     loop_iteration_counter = 0
-    overwatch_datetime_end = calculate_overwatch_end_dt(config['Parameters']['overwatch_time'])
+    overwatch_end_time = calculate_overwatch_end_time(config['Parameters']['overwatch_time'])
     loop_delayer = LoopDelayer(config['Parameters']['main_loop_minimum_time_duration'])
 
     # Main loop of the surveillance process
     logging.info('Starting surveillance process')
-    while datetime.now() < overwatch_datetime_end:
+    while time.monotonic() < overwatch_end_time:
         loop_delayer.delay()  # throttle main loop in order to limit CPU/GPU [Power] resources
         alive_logger.log_alive_status()  # Log every N minutes if process is still alive
         loop_iteration_counter += 1
 
-        # For each camera
+        # Read frames from all cameras, so they can be processed by the model in a single batch
+        camera_frames = []  # List of (camera videocapture object, frame) pairs
         for camera_vc in camera_vc_list:
-            frame = camera_vc.read()  # Read frame
-            if frame is None:
+            frame, timeout_counted = camera_vc.read()  # Read frame
+            if timeout_counted:  # Reported once per camera frame timeout, not in every iteration
                 logging.info(f'Skipping frame at {camera_vc.name} due to videocapture timeout')
-                check_and_report_camera_failure(bot, camera_vc, 2, config)
+                check_and_report_camera_failure(bot, camera_vc, 2, parsed_config)
+            if frame is None:  # No new frame since the last iteration
                 continue
-            frame = zoom_in_frame(frame, config[camera_vc.name]['zoom_in_frame'])  # Zoom in frame if set in config
-            frame = cv2.resize(frame, (frame_width, frame_height))  # Resize frame to the model size
-
-            # Put metadata info on a frame (zones, time to overwatch end, num_of_iteration, detections in a row)
-            frame = draw_metadata(frame, camera_vc, frame_width, frame_height, overwatch_datetime_end, loop_iteration_counter)
-
-            # Find objects in a frame
-            results = model.predict(frame, stream=True, verbose=False, imgsz=int(config['Model']['imgsz']))
-
-            # Process results
-            any_detection = False  # Assume that there is no detection of searched objects
-
-            for result in results:
-                boxes = result.boxes.cpu().numpy()
-                for box in boxes:
-                    # if object belongs to one of desired classes and its confidence is above threshold
-                    if (box.cls in ast.literal_eval(config['Model']['detection_classes']) and
-                            box.conf > float(config['Model']['confidence'])):
-                        class_name = result.names[box.cls[0]]
-                        coordinates = box.xyxy[0].astype(int)
-
-                        # Check if object is not in 'skip detection zones'. Drop detection if True
-                        object_not_in_zones = True  # Assume that object is not in any 'skip zone'
-                        for x1, y1, x2, y2 in camera_vc.zones:
-                            rectangle_coordinates = (x1 * frame_width, y1 * frame_height, x2 * frame_width, y2 * frame_height)
-                            if is_point_in_rectangle(midpoint_bottom(*coordinates), rectangle_coordinates):
-                                object_not_in_zones = False
-                                break
-
-                        if object_not_in_zones:
-                            draw_boxes(frame, box, class_name)
-                            any_detection = True
-
-            if any_detection:  # If there is at least one detection on image
-                time_diff = datetime.now() - camera_vc.last_detection_dt  # Measure time since last detection
+            if camera_vc.zoom_frame_shape != frame.shape:  # Stream resolution may change after reconnecting
+                camera_vc.zoom_slice = calculate_zoom_slice(frame.shape, camera_vc.zoom_in_params)
+                camera_vc.zoom_frame_shape = frame.shape
+            frame = frame[camera_vc.zoom_slice]  # Zoom in frame if set in config
+            # Frames are passed to the model in full resolution, letterboxing to imgsz is done by the model itself
+            camera_frames.append((camera_vc, frame))
+
+        # Find objects in all frames (the oldest queued batch is dropped if the model can't keep up)
+        if camera_frames:
+            for camera_vc, frame in inference_worker.put(camera_frames):
+                camera_vc.recycle(frame)
+
+        # Process results of batches handled by the model. If the loop is throttled (or no frame has been queued),
+        # there is time to wait for the newest batch, so results aren't handled one iteration late
+        results = inference_worker.get_results(wait_for_newest=loop_delayer.minimal_loop_time > 0 or not camera_frames)
+        if not camera_frames and not results:  # Nothing to process, wait for frames instead of spinning
+            wait_for_new_frame(camera_vc_list)
+
+        for camera_vc, frame, result in results:
+            # Keep objects that belong to one of desired classes and have confidence above threshold
+            boxes = filter_boxes(result.boxes, parsed_config.detection_classes, parsed_config.confidence)
+
+            # Drop objects that are in 'skip detection zones' (scaled to the size of this frame)
+            zones_px = camera_vc.get_zones_px(frame.shape[1], frame.shape[0])
+            boxes = boxes[~bottom_midpoints_in_zones(boxes.xyxy, zones_px)]
+
+            send_frame = False
+            if len(boxes) > 0:  # If there is at least one detection on image
+                time_diff = time.monotonic() - camera_vc.last_detection_time  # Measure time since last detection
                 camera_vc.detections_in_a_row += 1
 
                 # If the time since last notification is greater than set in config
                 # and detections occurred X times in a row - send frame with telegram bot
-                if send_frame_condition(time_diff, camera_vc, config):
-                    logging.info(f'Object has been spotted at camera: {camera_vc.name}')
-                    save_detection_frame('logs/detection_frames', frame, camera_vc.name, config['Parameters']['save_frames'])
-                    send_cv2_frame(bot, frame, 1, config)  # Inform the user by sending the frame
-                    camera_vc.last_detection_dt = datetime.now()  # Reset time since last notification
+                send_frame = send_frame_condition(time_diff, camera_vc, parsed_config)
 
             # If there are no detections on frame
             else:
                 camera_vc.detections_in_a_row = 0  # Zero detections_in_a_row counter
 
+            # Draw on a frame only if it is going to be seen (shown in window or sent)
+            display_frame = frame
+            if camera_vc.draw_frames or send_frame:
+                # Model gets full resolution frames, but they are shown and sent scaled down to imgsz width
+                display_frame, scale = downscale_frame(frame, parsed_config.imgsz)
+                # Put metadata info on a frame (zones, time to overwatch end, num_of_iteration, detections in a row)
+                draw_metadata(display_frame, camera_vc, overwatch_end_time, loop_iteration_counter)
+                draw_boxes(display_frame, boxes, result.names, scale)
+
+            if send_frame:
+                logging.info(f'Object has been spotted at camera: {camera_vc.name}')
+                # Frame is saved and sent in the background, so it is copied if it is the reused frame buffer
+                detection_frame = display_frame.copy() if display_frame is frame else display_frame
+                save_detection_frame('logs/detection_frames', detection_frame, camera_vc.name, parsed_config.save_frames)
+                send_cv2_frame(bot, detection_frame, 1, parsed_config)  # Inform the user by sending the frame
+                camera_vc.last_detection_time = time.monotonic()  # Reset time since last notification
+
             # Finally, show results in window
-            show_frame(frame, config, camera_vc.name)
+            show_frame(display_frame, camera_vc)
+            camera_vc.recycle(frame)  # Frame buffer can be reused for the next frames
 
     # Cleanup part
     logging.info(f'Finishing surveillance')
-    inform_the_user(bot, 'Finishing overwatch', 3, config)  # Inform user about overwatch end if verbose is at level 3
+    inference_worker.stop()
+    inform_the_user(bot, 'Finishing overwatch', 3, parsed_config)  # Inform user about overwatch end if verbose is at level 3
+    wait_for_pending_requests()  # Telegram messages are sent in the background, make sure they are delivered
     cleanup_cameras(camera_vc_list)  # Release all camera threads before finishing the main process
 
 
@@ -1,7 +1,8 @@
-import ast
 import os.path
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Tuple
+from typing import Tuple, Union
 
 import cv2
 import numpy as np
@@ -10,131 +11,86 @@ from ultralytics.engine.results import Boxes
 from .miscellaneous import calculate_time_to_end
 from .camera_tools import BufferlessVideoCapture
 
+_io_pool = ThreadPoolExecutor(max_workers=2)  # Encodes and writes detection frames in the background
 
-def draw_boxes(frame: np.ndarray, box: Boxes, class_name: str) -> None:
-    """
-    Draw bounding boxes and information on the given frame.
-
-    Args:
-        frame: The input image frame.
-        box: Object containing detection data.
-        class_name: The class name of the object.
-    """
-    coordinates = box.xyxy[0].astype(int)
-
-    # Draw bounding box on the image
-    cv2.rectangle(frame, tuple(coordinates[:2]), tuple(coordinates[2:]), (0, 0, 255), 2)
-
-    # Draw confidence score
-    cv2.putText(frame, str(round(box.conf[0], 2)), tuple(coordinates[:2]), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+# OpenCV drawing functions bound once, they are called for every detection
+_rectangle = cv2.rectangle
+_put_text = cv2.putText
+_FONT = cv2.FONT_HERSHEY_SIMPLEX
 
-    # Draw class name
-    cv2.putText(frame, class_name, (coordinates[0], coordinates[3]), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0, 255, 0), 2)
 
-
-def midpoint_bottom(x1: float, y1: float, x2: float, y2: float) -> Tuple[float, float]:
+def downscale_frame(frame: np.ndarray, width: int) -> Tuple[np.ndarray, float]:
     """
-    Calculate the midpoint at the bottom of rectangle.
+    Scale the frame down to the given width (keeping the aspect ratio) before it is drawn on, shown or sent,
+    so windows, uploads and metadata text don't grow with the camera resolution.
 
     Args:
-        x1: X-coordinate of the first point.
-        y1: Y-coordinate of the first point.
-        x2: X-coordinate of the second point.
-        y2: Y-coordinate of the second point.
+        frame: The input image frame.
+        width: Maximum width of the returned frame.
 
     Returns:
-    Tuple containing the X and Y coordinates of the midpoint at the bottom.
+    Tuple of:
+        - scaled frame (new array) or the input frame itself if it isn't wider than width
+        - scale of the returned frame relative to the input frame
     """
-    return (x1 + x2) / 2, max(y1, y2)
+    if frame.shape[1] <= width:
+        return frame, 1.0
+    scale = width / frame.shape[1]
+    return cv2.resize(frame, (width, round(frame.shape[0] * scale))), scale
 
 
-def midpoint(x1: float, y1: float, x2: float, y2: float) -> Tuple[float, float]:
+def draw_boxes(frame: np.ndarray, boxes: Boxes, names: dict, scale: float = 1.0) -> None:
     """
-    Calculate the midpoint of a rectangle.
+    Draw bounding boxes and information on the given frame.
+    Each layer (boxes, confidence scores, class names) is drawn for all boxes in one tight loop.
 
     Args:
-        x1: X-coordinate of the first point.
-        y1: Y-coordinate of the first point.
-        x2: X-coordinate of the second point.
-        y2: Y-coordinate of the second point.
-
-    Returns:
-    Tuple containing the X and Y coordinates of the midpoint.
+        frame: The input image frame.
+        boxes: Object containing detection data (as NumPy arrays).
+        names: Dictionary mapping class ids to class names.
+        scale: Scale of the frame relative to the frame the boxes were detected on.
     """
-    return (x1 + x2) / 2, (y1 + y2) / 2
+    xyxy = (boxes.xyxy * scale).astype(int).tolist()
+    confidences = boxes.conf.tolist()
+    classes = boxes.cls.astype(int).tolist()
 
+    # Draw bounding boxes on the image
+    for x1, y1, x2, y2 in xyxy:
+        _rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
 
-def is_point_in_rectangle(point: Tuple[float, float], rectangle: Tuple[float, float, float, float]) -> bool:
-    """
-    Check if a given point is within a specified rectangle.
+    # Draw confidence scores
+    for (x1, y1, _, _), confidence in zip(xyxy, confidences):
+        _put_text(frame, f'{confidence:.2f}', (x1, y1), _FONT, 1, (0, 255, 0), 2)
 
-    Args:
-        point: Tuple containing the X and Y coordinates of the point.
-        rectangle: Tuple containing the X1, Y1 (top-left corner) and X2, Y2 (bottom-right corner) coordinates of the rectangle.
-
-    Returns:
-    True if the point is inside the rectangle, False otherwise.
-    """
-    x1, y1, x2, y2 = rectangle
-    x, y = point
-    return x1 < x < x2 and y1 < y < y2
+    # Draw class names
+    for (x1, _, _, y2), class_id in zip(xyxy, classes):
+        _put_text(frame, names[class_id], (x1, y2), _FONT, 0.75, (0, 255, 0), 2)
 
 
-def zoom_in_frame(frame: np.ndarray, zoom_in_params: str) -> np.ndarray:
+def calculate_zoom_slice(frame_shape: Tuple[int, ...], zoom_in_params: Union[bool, list]) -> Tuple[slice, slice]:
     """
-    Zoom in frame to the coordinates given in camera config section
+    Calculate slices used to zoom in frames to the coordinates given in camera config section.
+    Zoomed in frame (frame[zoom_slice]) is a view of the original frame, so no pixels are copied.
 
     Args:
-        frame: NumPy array representing the input image frame.
-        zoom_in_params: String representation of a list containing four values [left, right, top, bottom] to zoom in the frame.
+        frame_shape: Shape of the input image frame.
+        zoom_in_params: List containing four values [left, right, top, bottom] to zoom in the frame (or False).
 
     Returns:
-    NumPy array representing zoomed in frame.
-    If the strip_params are not valid, the original frame is returned.
+    Tuple of (rows, columns) slices.
+    If the zoom_in_params are not valid, slices cover the whole frame.
     """
-    zoom_in_params_literal = ast.literal_eval(zoom_in_params)
-    if isinstance(zoom_in_params_literal, list) and len(zoom_in_params_literal) == 4:
-        left, right, top, bottom = zoom_in_params_literal
-        new_height = frame.shape[0] - (top + bottom)
-        new_width = frame.shape[1] - (left + right)
-        return frame[top : top + new_height, left : left + new_width]
+    if isinstance(zoom_in_params, list) and len(zoom_in_params) == 4:
+        left, right, top, bottom = zoom_in_params
+        return slice(top, frame_shape[0] - bottom), slice(left, frame_shape[1] - right)
     else:
-        return frame
-
-
-def draw_filled_rectangle_with_alpha(image: np.ndarray,
-                                     pt1: Tuple[int, int],
-                                     pt2: Tuple[int, int],
-                                     color: Tuple[int, int, int],
-                                     alpha: float = 0.5) -> np.ndarray:
-    """
-    Draw a filled rectangle on the input image with alpha transparency.
-
-    Args:
-        image: NumPy array representing the input image.
-        pt1: Tuple containing (x, y) coordinates of one corner of the rectangle.
-        pt2: Tuple containing (x, y) coordinates of the opposite corner of the rectangle.
-        color: Tuple containing (B, G, R) values for the rectangle color.
-        alpha: Alpha value for blending (default is 0.5).
-
-    Returns:
-    Numpy array representing the image with the filled rectangle.
-    """
-    overlay = image.copy()
-    cv2.rectangle(overlay, pt1, pt2, color, -1)  # Draw the filled rectangle on the overlay
-
-    # Combine the overlay with the original image using alpha blending
-    cv2.addWeighted(overlay, alpha, image, 1 - alpha, 0, image)
-
-    return image
+        return slice(None), slice(None)
 
 
 def draw_metadata(
     frame: np.ndarray,
     camera: BufferlessVideoCapture,
-    frame_width: int,
-    frame_height: int,
-    overwatch_datetime_end: datetime,
+    overwatch_end_time: float,
     loop_iteration_counter: int,
 ):
     """
@@ -146,46 +102,40 @@ def draw_metadata(
     Args:
         frame: processed frame
         camera: camera and metadata dictionary
-        frame_width:
-        frame_height:
-        overwatch_datetime_end:
+        overwatch_end_time: monotonic clock time of the end of surveillance
         loop_iteration_counter: processed frames counter
 
     Returns:
     Frame with metadata
     """
-    for x1, y1, x2, y2 in camera.zones:
-        frame = draw_filled_rectangle_with_alpha(
-            frame,
-            (int(x1 * frame_width), int(y1 * frame_height)),
-            (int(x2 * frame_width), int(y2 * frame_height)),
-            (32, 148, 229),
-            0.5,
-        )
-    cv2.putText(frame, calculate_time_to_end(datetime.now(), overwatch_datetime_end), (1, 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+    if camera.zones:  # Blend all zones at once with images prepared for this camera and frame size
+        zone_overlay, zone_scale = camera.get_zone_images(frame.shape[1], frame.shape[0])
+        cv2.multiply(frame, zone_scale, frame, scale=1 / 255)
+        cv2.add(frame, zone_overlay, frame)
+    cv2.putText(frame, calculate_time_to_end(time.monotonic(), overwatch_end_time), (1, 12), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
     cv2.putText(frame, str(loop_iteration_counter), (1, 32), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
     cv2.putText(frame, str(camera.detections_in_a_row), (1, 52), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
     return frame
 
 
-def show_frame(frame, config, camera_key):
+def show_frame(frame, camera):
     """
     Show frame in a window
 
     Args:
         frame: frame that will be displayed
-        config: config dictionary
-        camera_key: camera name used to name the window
+        camera: camera object, its name is used to name the window
     """
-    if config[camera_key]['show_camera_window'] == 'True':
-        cv2.imshow(f'{camera_key}', frame)
+    if camera.draw_frames:
+        cv2.imshow(f'{camera.name}', frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             pass
 
 
 def save_detection_frame(path, frame, camera_name, save):
     """
-    Save frame with detection to a specified directory
+    Save frame with detection to a specified directory.
+    Frame is encoded and written in the background, so it must not be modified afterwards.
 
     Args:
         path: path to save directory
@@ -193,6 +143,7 @@ def save_detection_frame(path, frame, camera_name, save):
         camera_name: camera name as str
         save: boolean flag to proceed save
     """
-    if eval(save):
+    if save:
         detection_datetime = datetime.now().strftime('%Y_%m_%d___%H_%M_%S')
-        cv2.imwrite(os.path.join(path, f'{detection_datetime}_{camera_name}.jpg'), frame)
+        file_path = os.path.join(path, f'{detection_datetime}_{camera_name}.jpg')
+        _io_pool.submit(cv2.imwrite, file_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 85, cv2.IMWRITE_JPEG_OPTIMIZE, 0])
@@ -0,0 +1,42 @@
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def _bottom_midpoints_in_zones(xyxy: np.ndarray, zones: np.ndarray) -> np.ndarray:
+    """
+    Compiled loop of bottom_midpoints_in_zones (float32 arrays only).
+    """
+    n, k = xyxy.shape[0], zones.shape[0]
+    inside = np.zeros(n, np.bool_)
+    for i in range(n):
+        mx = (xyxy[i, 0] + xyxy[i, 2]) * 0.5
+        my = xyxy[i, 1] if xyxy[i, 1] > xyxy[i, 3] else xyxy[i, 3]
+        for j in range(k):
+            if zones[j, 0] < mx < zones[j, 2] and zones[j, 1] < my < zones[j, 3]:
+                inside[i] = True
+                break
+    return inside
+
+
+def bottom_midpoints_in_zones(xyxy: np.ndarray, zones: np.ndarray) -> np.ndarray:
+    """
+    Check for each box if the midpoint at the bottom of the box lies within any of the given zones.
+
+    Args:
+        xyxy: Array of shape (N, 4) containing X1, Y1, X2, Y2 coordinates of the boxes.
+        zones: Array of shape (K, 4) containing X1, Y1, X2, Y2 coordinates of the zones (in pixels).
+
+    Returns:
+    Boolean array of shape (N,). True if the bottom midpoint of the box is inside at least one zone.
+    """
+    # Contiguous float32 arrays keep a single compiled signature (boxes.xyxy is a strided view of the boxes data)
+    return _bottom_midpoints_in_zones(np.ascontiguousarray(xyxy, dtype=np.float32),
+                                      np.ascontiguousarray(zones, dtype=np.float32))
+
+
+def warmup_geometry() -> None:
+    """
+    Compile (or load from cache) Numba functions, so it doesn't happen in the first iteration of the main loop.
+    """
+    bottom_midpoints_in_zones(np.zeros((1, 4), dtype=np.float32), np.zeros((1, 4), dtype=np.float32))
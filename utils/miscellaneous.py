@@ -1,37 +1,35 @@
 import logging
-from datetime import datetime, timedelta
 import time
 
 
-def calculate_overwatch_end_dt(overwatch_time: str) -> datetime:
+def calculate_overwatch_end_time(overwatch_time: str) -> float:
     """
-    Calculate the end datetime for an Overwatch session.
+    Calculate the end time for an Overwatch session.
 
     Args:
         overwatch_time: String representing the time for the Overwatch session duration.
 
     Returns:
-    Datetime object representing the calculated end time of the Overwatch session.
+    Monotonic clock time (time.monotonic()) of the calculated end of the Overwatch session.
+    Monotonic clock is not affected by system clock changes (e.g. DST).
     """
     hours, minutes = map(int, overwatch_time.split(':'))
-    return datetime.now() + timedelta(hours=hours, minutes=minutes)
+    return time.monotonic() + hours * 3600 + minutes * 60
 
 
-def calculate_time_to_end(dt1: datetime, dt2: datetime) -> str:
+def calculate_time_to_end(t1: float, t2: float) -> str:
     """
-    Calculate the time difference between two datetime objects and return the result in 'HH:MM:SS' format.
+    Calculate the time difference between two monotonic clock times and return the result in 'HH:MM:SS' format.
 
     Args:
-        dt1: Datetime object representing the start time.
-        dt2: Datetime object representing the end time.
+        t1: Start time (in seconds).
+        t2: End time (in seconds).
 
     Returns:
     String representing the time difference in 'HH:MM:SS' format.
     """
-    time_difference = dt2 - dt1
-
     # Convert the time difference to hours, minutes, and seconds
-    total_seconds = time_difference.total_seconds()
+    total_seconds = t2 - t1
     hours = int(total_seconds // 3600)
     minutes = int((total_seconds % 3600) // 60)
     seconds = int(total_seconds % 60)
@@ -88,7 +86,7 @@ class AliveLogger:
         Args:
             time_interval: Time interval to log that process is alive
         """
-        self.last_log_time = datetime.now()
+        self.last_log_time = time.monotonic()
         self.time_interval = int(time_interval)
 
     def log_alive_status(self) -> None:
@@ -96,6 +94,6 @@ class AliveLogger:
         Log the alive status
         """
 
-        if datetime.now() - self.last_log_time > timedelta(minutes=self.time_interval):
+        if time.monotonic() - self.last_log_time > self.time_interval * 60:
             logging.info('Process is still running')
-            self.last_log_time = datetime.now()
+            self.last_log_time = time.monotonic()
@@ -0,0 +1,186 @@
+import configparser
+import functools
+import logging
+import os.path
+import queue
+import threading
+import time
+from typing import Tuple
+
+import torch
+from ultralytics import YOLO
+from ultralytics.engine.results import Boxes
+
+
+def load_model(config: configparser.ConfigParser, batch_size: int) -> Tuple[YOLO, int]:
+    """
+    Load the detection model and set up PyTorch for inference.
+    If 'export_tensorrt' is set in config and CUDA is available, the model is exported once to a TensorRT engine
+    (FP16, fixed batch size) and the engine is loaded instead. Exported engine is reused in the next runs.
+
+    Args:
+        config: ConfigParser object containing the configuration settings.
+        batch_size: Number of frames processed by the model at once (number of cameras).
+
+    Returns:
+    Loaded model and its fixed batch size (0 if the model accepts batches of any size).
+    """
+    if torch.cuda.is_available():
+        torch.backends.cudnn.benchmark = True  # Input shape is fixed by imgsz, so the fastest algorithms are selected once
+        torch.set_num_threads(1)  # Model runs on GPU, avoid CPU threads competing with capture and drawing threads
+
+    path = config['Model']['path']
+    imgsz = int(config['Model']['imgsz'])
+    if not (config['Model'].getboolean('export_tensorrt', fallback=False) and torch.cuda.is_available() and path.endswith('.pt')):
+        return YOLO(path), 0
+
+    # Engine is built for a given image and batch size, so both are part of its name
+    engine_path = f'{os.path.splitext(path)[0]}_{imgsz}_b{batch_size}.engine'
+    if not os.path.exists(engine_path):
+        logging.info(f'Exporting model to TensorRT engine: {engine_path}')
+        try:
+            exported_path = YOLO(path).export(format='engine', half=True, imgsz=imgsz, batch=batch_size, dynamic=False, device=0)
+            os.replace(exported_path, engine_path)
+        except Exception:
+            logging.exception('TensorRT export failed, using PyTorch model')
+            return YOLO(path), 0
+
+    return YOLO(engine_path, task='detect'), batch_size
+
+
+@functools.lru_cache(maxsize=None)
+def _classes_tensor(detection_classes: Tuple[int, ...], device: torch.device) -> torch.Tensor:
+    """
+    Tensor with desired class ids, created once per device (results of the model stay on its device).
+    """
+    return torch.tensor(detection_classes, dtype=torch.float32, device=device)
+
+
+def filter_boxes(boxes: Boxes, detection_classes: Tuple[int, ...], confidence: float) -> Boxes:
+    """
+    Keep boxes of desired classes with confidence above threshold.
+    Filtering is done on the device of the model, so only the kept boxes are copied to the CPU.
+
+    Args:
+        boxes: Boxes of a single result returned by the model.
+        detection_classes: Desired class ids.
+        confidence: Minimum confidence of kept boxes.
+
+    Returns:
+    Filtered boxes, converted to NumPy arrays.
+    """
+    mask = (boxes.conf > confidence) & torch.isin(boxes.cls, _classes_tensor(detection_classes, boxes.cls.device))
+    return boxes[mask].cpu().numpy()
+
+
+class InferenceWorker:
+    """
+    A class running model inference in a separate thread, so that frame capture, drawing and notifications
+    in the main thread don't keep the model (GPU) idle.
+    Usage: put() a batch of (camera, frame) pairs, then collect (camera, frame, result) triples with get_results().
+    """
+
+    def __init__(self, model: YOLO, imgsz: int, batch_size: int = 0, max_queued_batches: int = 2) -> None:
+        """
+        Initializes the InferenceWorker object and starts the inference thread.
+
+        Args:
+            model: Loaded YOLO model.
+            imgsz: Image size used by the model.
+            batch_size: Fixed batch size of the model (0 if the model accepts batches of any size).
+            max_queued_batches: Number of batches waiting for the model. The oldest batch is dropped if exceeded.
+        """
+        self.model = model
+        self.imgsz = imgsz
+        self.batch_size = batch_size
+        self.input_q = queue.Queue(maxsize=max_queued_batches)
+        self.output_q = queue.Queue(maxsize=max_queued_batches + 2)
+        self._in_flight = 0  # Batches put into the worker, but not yet collected with get_results()
+        self._stop = False
+
+        self.t = threading.Thread(target=self._worker)
+        self.t.daemon = True
+        self.t.start()
+
+    def stop(self) -> None:
+        """
+        Send signal to stop the inference thread.
+        """
+        self._stop = True
+
+    def put(self, camera_frames: list) -> list:
+        """
+        Queue a batch of frames for the model.
+        If the model can't keep up (queue is full), the oldest queued batch is dropped, so the newest frames win.
+
+        Args:
+            camera_frames: List of (camera videocapture object, frame) pairs.
+
+        Returns:
+        List of (camera videocapture object, frame) pairs of the dropped batch (empty if nothing was dropped).
+        """
+        dropped = []
+        while True:
+            try:
+                self.input_q.put_nowait(camera_frames)
+                break
+            except queue.Full:
+                try:
+                    dropped += self.input_q.get_nowait()
+                    self._in_flight -= 1
+                except queue.Empty:  # The model has just taken the oldest batch
+                    pass
+        self._in_flight += 1
+        return dropped
+
+    def get_results(self, wait_for_newest: bool, timeout: float = 1.0) -> list:
+        """
+        Collect results of all processed batches.
+        If wait_for_newest is set, wait (up to timeout) for all batches in flight, including the one just put.
+        Otherwise, wait only for the older batches, so the newest batch is processed by the model
+        while the main thread handles the previous one.
+
+        Args:
+            wait_for_newest: Flag to wait also for the newest batch.
+            timeout: Maximum time to wait (in seconds).
+
+        Returns:
+        List of (camera videocapture object, frame, result) triples.
+        """
+        wait_count = self._in_flight if wait_for_newest else self._in_flight - 1
+        deadline = time.monotonic() + timeout
+        batches = []
+        try:
+            while len(batches) < wait_count:
+                batches.append(self.output_q.get(timeout=max(deadline - time.monotonic(), 0)))
+            while True:
+                batches.append(self.output_q.get_nowait())
+        except queue.Empty:
+            pass
+        self._in_flight -= len(batches)
+
+        return [item for batch in batches for item in batch]
+
+    def _worker(self) -> None:
+        """
+        Internal method that runs the model on queued batches and stores the results in the output queue.
+        """
+        while not self._stop:
+            try:
+                camera_frames = self.input_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            frames = [frame for _, frame in camera_frames]
+            if self.batch_size:  # Pad the batch with the last frame if the model has a fixed batch size (extra results are dropped)
+                frames += [frames[-1]] * (self.batch_size - len(frames))
+
+            try:
+                # Find objects in all frames with a single model call (one result per frame, in the same order)
+                with torch.inference_mode():  # Autograd mode is per thread, so it is set in the inference thread
+                    results = self.model.predict(frames, stream=False, verbose=False, imgsz=self.imgsz)
+            except Exception:
+                logging.exception('Model inference failed, dropping the batch')
+                results = []
+
+            self.output_q.put([(camera_vc, frame, result) for (camera_vc, frame), result in zip(camera_frames, results)])
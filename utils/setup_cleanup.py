@@ -6,12 +6,29 @@ import os.path
 import sys
 import time
 import logging
+from dataclasses import dataclass
 
 import cv2
 
 from utils.camera_tools import BufferlessVideoCapture
 
 
+@dataclass
+class ParsedConfig:
+    """
+    Config values used in the main loop, parsed once at startup.
+    """
+    detection_classes: tuple[int, ...]
+    confidence: float
+    imgsz: int
+    save_frames: bool
+    min_detections_in_a_row: int
+    bot_frame_timeout: int
+    runtime_verbose_level: int
+    timeout_count_before_message: int
+    chat_id: str
+
+
 def parse_args() -> argparse.Namespace:
     """
     Parse input arguments
@@ -69,6 +86,29 @@ def load_config(path_to_config: str = './config.ini') -> configparser.ConfigPars
     return config
 
 
+def parse_config(config: configparser.ConfigParser) -> ParsedConfig:
+    """
+    Parse config values used in the main loop into their target types.
+
+    Args:
+        config: ConfigParser object containing the configuration settings.
+
+    Returns:
+    ParsedConfig object with typed configuration values.
+    """
+    return ParsedConfig(
+        detection_classes=tuple(sorted(set(ast.literal_eval(config['Model']['detection_classes'])))),
+        confidence=float(config['Model']['confidence']),
+        imgsz=int(config['Model']['imgsz']),
+        save_frames=config['Parameters'].getboolean('save_frames'),
+        min_detections_in_a_row=int(config['Parameters']['min_detections_in_a_row']),
+        bot_frame_timeout=int(config['Telegram']['bot_frame_timeout']),
+        runtime_verbose_level=int(config['Parameters']['runtime_verbose_level']),
+        timeout_count_before_message=int(config['Parameters']['timeout_count_before_message']),
+        chat_id=config['Telegram']['chat_id'],
+    )
+
+
 def setup_cameras(config: configparser.ConfigParser) -> list[BufferlessVideoCapture]:
     """
     Set up cameras based on the configuration settings.
@@ -81,6 +121,7 @@ def setup_cameras(config: configparser.ConfigParser) -> list[BufferlessVideoCapt
     """
     camera_config_section_names = [x for x in config.sections() if x[:7] == 'Camera_']
     camera_vc_list = []
+    hardware_decoder = config['Parameters'].get('hardware_decoder', fallback='')  # Decode streams on hardware if set
 
     for camera_config in camera_config_section_names:
         stream_address = config[camera_config]['stream_address']  # Setup Stream
@@ -94,7 +135,9 @@ def setup_cameras(config: configparser.ConfigParser) -> list[BufferlessVideoCapt
         if not isinstance(draw_frames, bool):
             raise ValueError("'show_camera_window' should be set to 'True' or 'False'")
 
-        camera_vc = BufferlessVideoCapture(camera_config, stream_address, zones, draw_frames)
+        zoom_in_params = ast.literal_eval(config[camera_config]['zoom_in_frame'])  # Setup zoom in
+
+        camera_vc = BufferlessVideoCapture(camera_config, stream_address, zones, draw_frames, zoom_in_params, hardware_decoder)
         camera_vc_list.append(camera_vc)
 
     return camera_vc_list
@@ -114,20 +157,3 @@ def cleanup_cameras(cameras_list: list[BufferlessVideoCapture]):
     time.sleep(1)  # Wait a sec for all threads to release
     cv2.destroyAllWindows()  # Destroy windows if they are visible
 
-
-def calculate_frame_size(camera_vc: BufferlessVideoCapture, config: dict):
-    """
-    Calculate frame width and height of desired frame shape
-
-    Args:
-        camera_vc: camera bufferless videocapture object
-        config: config dictionary
-
-    Returns:
-        calculated width and height
-
-    """
-    frame = camera_vc.read()
-    width = int(config['Model']['imgsz'])
-    height = int(frame.shape[0] * int(config['Model']['imgsz']) / frame.shape[1])
-    return width, height
@@ -1,53 +1,141 @@
 import io
-from datetime import timedelta
+import logging
+import queue
+import threading
 
 import cv2
 import numpy as np
 from telepot import Bot
 
 from .camera_tools import BufferlessVideoCapture
+from .setup_cleanup import ParsedConfig
 
+try:  # Optional, SIMD accelerated JPEG encoding (requires libturbojpeg)
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbo_jpeg = TurboJPEG()
+except (ImportError, RuntimeError, OSError):
+    _turbo_jpeg = None
 
-def send_frame_condition(time_diff, camera_vc, config):
+_requests = queue.Queue(maxsize=16)  # Telegram requests waiting to be sent (the oldest one is dropped on overflow)
+_sender_thread = None
+
+
+def _sender() -> None:
+    """
+    Send queued telegram requests one by one (runs in a background thread).
+    """
+    while True:
+        request, args = _requests.get()
+        try:
+            request(*args)
+        except Exception:
+            logging.exception('Telegram request failed')
+        finally:
+            _requests.task_done()
+
+
+def _send_in_background(request, *args) -> None:
+    """
+    Queue a telegram request, so network latency (or failure) doesn't stall the caller.
+
+    Args:
+        request: Function sending the request (e.g. bot.sendMessage)
+        *args: Request arguments
+    """
+    global _sender_thread
+    if _sender_thread is None:
+        _sender_thread = threading.Thread(target=_sender, daemon=True)
+        _sender_thread.start()
+
+    while True:
+        try:
+            _requests.put_nowait((request, args))
+            return
+        except queue.Full:
+            try:
+                _requests.get_nowait()
+                _requests.task_done()
+                logging.warning('Too many pending telegram requests, dropping the oldest one')
+            except queue.Empty:
+                pass
+
+
+def wait_for_pending_requests() -> None:
+    """
+    Block until all queued telegram requests are sent (or failed).
+    """
+    _requests.join()
+
+
+def encode_jpeg(frame: np.ndarray, quality: int = 85) -> bytes:
+    """
+    Encode a CV2 (BGR) frame to JPEG. TurboJPEG is used if available, CV2 otherwise.
+
+    Args:
+        frame: The CV2 frame to be encoded.
+        quality: JPEG quality (0 - 100).
+
+    Returns:
+    Encoded image bytes (empty if encoding failed).
+    """
+    if _turbo_jpeg is not None:
+        return _turbo_jpeg.encode(frame, quality=quality, pixel_format=TJPF_BGR)
+    success, encoded_image = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return encoded_image.tobytes() if success else b''
+
+
+def send_frame_condition(time_diff, camera_vc, config: ParsedConfig):
     """
     Check if the time since last notification is greater than set in config and detections occurred X times in a row
 
     Args:
-        time_diff: Time since the last message was sent
+        time_diff: Time since the last message was sent (in seconds)
         camera_vc: camera videocapture object
-        config: config dictionary
+        config: parsed config
 
     Returns:
     Boolean information if condition has been met
     """
-    if (time_diff > timedelta(seconds=int(config['Telegram']['bot_frame_timeout']))
-            and camera_vc.detections_in_a_row >= int(config['Parameters']['min_detections_in_a_row'])):
+    if (time_diff > config.bot_frame_timeout
+            and camera_vc.detections_in_a_row >= config.min_detections_in_a_row):
         return True
     else:
         return False
 
 
-def send_cv2_frame(bot: Bot, frame: np.ndarray, verbose_level: int, config: dict) -> None:
+def send_cv2_frame(bot: Bot, frame: np.ndarray, verbose_level: int, config: ParsedConfig) -> None:
     """
-    Send a CV2 frame as a photo using a Telegram bot.
+    Send a CV2 frame as a photo using a Telegram bot. Frame is encoded and sent in the background,
+    so it must not be modified afterwards.
 
     Args:
         bot: The Telegram bot instance.
         frame: The CV2 frame to be sent.
         verbose_level: Message importance level
-        config: Config dictionary
+        config: Parsed config
 
     """
-    if int(config['Parameters']['runtime_verbose_level']) >= verbose_level:
-        success, encoded_image = cv2.imencode('.jpg', frame)
-        if success:
-            image_bytes = encoded_image.tobytes()
-            image_buffer = io.BytesIO(image_bytes)
-            buffered_reader = io.BufferedReader(image_buffer)
-            bot.sendPhoto(config['Telegram']['chat_id'], photo=buffered_reader)
+    if config.runtime_verbose_level >= verbose_level:
+        _send_in_background(_send_photo, bot, frame, config.chat_id)
+
+
+def _send_photo(bot: Bot, frame: np.ndarray, chat_id: str) -> None:
+    """
+    Encode the frame and send it as a photo (runs in a background thread).
+
+    Args:
+        bot: The Telegram bot instance.
+        frame: The CV2 frame to be sent.
+        chat_id: Telegram chat id
+    """
+    image_bytes = encode_jpeg(frame)
+    if image_bytes:
+        image_buffer = io.BytesIO(image_bytes)
+        buffered_reader = io.BufferedReader(image_buffer)
+        bot.sendPhoto(chat_id, photo=buffered_reader)
 
 
-def inform_the_user(bot: Bot, information_text: str, verbose_level: int, config: dict):
+def inform_the_user(bot: Bot, information_text: str, verbose_level: int, config: ParsedConfig):
     """
     Inform the user about <information_text>
 
@@ -55,13 +143,13 @@ def inform_the_user(bot: Bot, information_text: str, verbose_level: int, config:
         bot: bot used to send information
         information_text: content of message
         verbose_level: Message importance level
-        config: config dictionary
+        config: parsed config
     """
-    if int(config['Parameters']['runtime_verbose_level']) >= verbose_level:
-        bot.sendMessage(config['Telegram']['chat_id'], information_text)
+    if config.runtime_verbose_level >= verbose_level:
+        _send_in_background(bot.sendMessage, config.chat_id, information_text)
 
 
-def check_and_report_camera_failure(bot: Bot, camera_vc: BufferlessVideoCapture, verbose_level: int, config: dict):
+def check_and_report_camera_failure(bot: Bot, camera_vc: BufferlessVideoCapture, verbose_level: int, config: ParsedConfig):
     """
     Report camera failure status after X timeouts
 
@@ -69,8 +157,8 @@ def check_and_report_camera_failure(bot: Bot, camera_vc: BufferlessVideoCapture,
         bot: telegram bot object
         camera_vc: camera bufferless videocapture object
         verbose_level: Message importance level
-        config: config dictionary
+        config: parsed config
     """
-    timeout_count = int(config['Parameters']['timeout_count_before_message'])
-    if camera_vc.queue_timeouts_counter == timeout_count and int(config['Parameters']['runtime_verbose_level']) >= verbose_level:
-        bot.sendMessage(config['Telegram']['chat_id'], f'camera {camera_vc.name} has failed {timeout_count} times')
+    timeout_count = config.timeout_count_before_message
+    if camera_vc.queue_timeouts_counter == timeout_count and config.runtime_verbose_level >= verbose_level:
+        _send_in_background(bot.sendMessage, config.chat_id, f'camera {camera_vc.name} has failed {timeout_count} times')